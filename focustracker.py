@@ -7,6 +7,7 @@ import time
 import focusicon
 from idletracker import IdleTracker
 from notifier import Notifier
+from recentfocus import RecentFocus
 
 
 class FocusTracker(Notifier):
@@ -64,6 +65,7 @@ class FocusTracker(Notifier):
         self.duration = config["duration"]
         self.idle_threshold = config["idle_threshold"]
         self.idle_long_threshold = config["idle_long_threshold"]
+        self.recent_window = config["recent_window"]
         try:
             with open(config["working_list"]) as f:
                 working_list = json.load(f)
@@ -71,14 +73,24 @@ class FocusTracker(Notifier):
             working_list = []
         self.working_list = working_list
 
-    def __init__(self, config):
+    def __init__(self, config, scheduler):
         self._load_config(config)
+        self.scheduler = scheduler
         self.stopping = True
         self.idle_tracker = IdleTracker()
         self.icon = focusicon.FocusIcon()
         self.icon.run()
         self.check_new_day_timer = None
         self._new_day = False
+        self.idle_listeners = []
+        self.idle_lock = threading.Lock()
+        # Unlike working_hour/playing_hour, these survive resets and new days
+        # so that others can diff them over a window of time. They leave out
+        # Idle samples, and last_working is about the last non-Idle one.
+        self.working_cumulative = 0
+        self.playing_cumulative = 0
+        self.last_working = False
+        self.recent = RecentFocus(int(self.recent_window / self.duration) + 1)
         self._reset()
 
     def _reset(self):
@@ -90,6 +102,7 @@ class FocusTracker(Notifier):
         self.last_track = None
         self.state = FocusTracker.idle
         self.start = None
+        self.recent.new_day()
 
     def report(self, typ):
         res = {}
@@ -117,6 +130,9 @@ class FocusTracker(Notifier):
                 res[name] = rep
         return res
 
+    def report_recent(self, secs):
+        return self.recent.report(secs)
+
     def get_wm_name(xprop_id, default):
         for line in xprop_id:
             match = re.match("WM_NAME\((?P<type>.+)\) = (?P<name>.+)", line)
@@ -134,8 +150,7 @@ class FocusTracker(Notifier):
                 return match.group("class")
         return default
 
-    def get_active_window_title(self):
-        idle_time = self.idle_tracker.get_idle_time()
+    def get_active_window_title(self, idle_time):
         if idle_time > self.idle_threshold:
             return FocusTracker.Idle, FocusTracker.Idle
 
@@ -191,6 +206,7 @@ class FocusTracker(Notifier):
         if wm_class not in self.apps:
             self.apps[wm_class] = FocusTracker.App(wm_class)
         self.apps[wm_class].track(wm_name, secs, working)
+        self.recent.track(wm_class, wm_name, secs, working)
 
         if working:
             self.working_hour += secs
@@ -199,6 +215,30 @@ class FocusTracker(Notifier):
             self.playing_hour += secs
             self.playing_after_last_report += secs
 
+        if wm_class != FocusTracker.Idle:
+            self.last_working = working
+            if working:
+                self.working_cumulative += secs
+            else:
+                self.playing_cumulative += secs
+
+    def snapshot(self):
+        return self.working_cumulative, self.playing_cumulative
+
+    def add_idle_listener(self, threshold, callback):
+        # callback(idle, idle_time) is called from the sampler whenever the
+        # idle time crosses the threshold in either direction
+        self.idle_listeners.append([threshold, callback, False])
+
+    def _notify_idle(self, idle_time):
+        with self.idle_lock:
+            for listener in self.idle_listeners:
+                threshold, callback, was_idle = listener
+                idle = idle_time > threshold
+                if idle != was_idle:
+                    listener[2] = idle
+                    callback(idle, idle_time)
+
     def get_elapsed_time(self):
         now = datetime.datetime.now()
         duration = (
@@ -212,19 +252,24 @@ class FocusTracker(Notifier):
         self.icon.show_start()
         self.stopping = False
         while not self.stopping:
-            if self.new_day():
+            idle_time = self.idle_tracker.get_idle_time()
+            self._notify_idle(idle_time)
+            if self.new_day(idle_time):
                 self._reset()
             else:
-                wm_class, wm_name = self.get_active_window_title()
+                wm_class, wm_name = self.get_active_window_title(idle_time)
                 elapsed = self.get_elapsed_time()
                 self.track_focused_window(wm_class, wm_name, elapsed)
             time.sleep(self.duration)
+        # Nobody samples the idle time anymore, so do not leave listeners
+        # believing the user is still away. This is done here rather than in
+        # _stop so that it comes after the last sample of the loop.
+        self._notify_idle(0)
         self.stopping = False
 
-    def new_day(self):
+    def new_day(self, idle_time):
         if not self._new_day:
             return False
-        idle_time = self.idle_tracker.get_idle_time()
         if idle_time > self.idle_long_threshold:
             return True
         self._new_day = False
@@ -240,10 +285,9 @@ class FocusTracker(Notifier):
         future = datetime.datetime(t.year, t.month, t.day, 7, 0)
         if t.timestamp() > future.timestamp():
             future += datetime.timedelta(days=1)
-        self.check_new_day_timer = threading.Timer(
+        self.check_new_day_timer = self.scheduler.call_later(
             (future - t).total_seconds(), self.start_new_day
         )
-        self.check_new_day_timer.start()
 
     def run(self):
         if self.state != FocusTracker.idle:
@@ -1,6 +1,6 @@
 import datetime
-import threading
 
+from focustracker import FocusTracker
 from idletracker import IdleTracker
 from notifier import Notifier
 
@@ -18,14 +18,31 @@ class PomodoroTimer(Notifier):
         self.rest_time_after_session = config["rest_time_after_session"]
         self.working_time = config["working_time"]
         self.idle_threshold = config["idle_threshold"]
+        self.idle_stop_threshold = config["idle_stop_threshold"]
 
-    def __init__(self, config):
+    def __init__(self, config, scheduler, focus_tracker):
         self._load_config(config)
         self.idle_tracker = IdleTracker()
+        self.scheduler = scheduler
+        self.focus_tracker = focus_tracker
+        self.focus_tracker.add_idle_listener(self.idle_threshold, self._on_idle)
+        self.focus_tracker.add_idle_listener(
+            self.idle_stop_threshold, self._on_long_idle
+        )
+        self.timer = None
+        # Whether the user is idle as last told by the focus tracker
+        self.user_idle = False
+        self.rounds = []
+        self.rounds_date = datetime.date.today()
         self._reset()
 
     def _reset(self):
         self.state = PomodoroTimer.State.idle
+        self.working_phase = False
+        self.phase_secs = 0
+        self.phase_callback = None
+        # Remaining seconds of the working phase while paused for idleness
+        self.paused = None
 
     def round(self):
         return (
@@ -36,25 +53,122 @@ class PomodoroTimer(Notifier):
 
     def arm_timer(self, time_mins, callback):
         idle_time = self.idle_tracker.get_idle_time()
-        if idle_time > self.idle_threshold:
+        tracking = self.focus_tracker.state == FocusTracker.tracking
+        if idle_time > self.idle_threshold and not tracking:
+            # Nobody will tell us about idle transitions, so stop right away
             self.notify("Pomodoro timer", "Idle for a long time. Stop working")
             self._stop()
             return
         self.date_timer_armed = datetime.datetime.now()
-        self.timer = threading.Timer(time_mins * 60, callback)
-        self.timer.start()
+        self.phase_secs = time_mins * 60
+        self.phase_callback = callback
+        if tracking and self.user_idle and self.working_phase:
+            # Start the round paused; _on_idle resumes it when the user comes
+            # back and _on_long_idle stops it if they do not
+            self.paused = self.phase_secs
+            self._notify_paused()
+            return
+        self.timer = self.scheduler.call_later(self.phase_secs, callback)
+
+    def _open_segment(self):
+        self.segment_start = self.focus_tracker.snapshot()
+
+    def _close_segment(self, idle_time=0):
+        working, playing = self.focus_tracker.snapshot()
+        # The snapshot leaves out Idle samples, but until the focus tracker's
+        # own idle threshold the idle stretch was counted in the category of
+        # the window that was left focused
+        counted = min(idle_time, self.focus_tracker.idle_threshold)
+        if self.focus_tracker.last_working:
+            working -= counted
+        else:
+            playing -= counted
+        self.round_working += max(0, working - self.segment_start[0])
+        self.round_playing += max(0, playing - self.segment_start[1])
+
+    def _expire_rounds(self):
+        # Only keep today's rounds
+        today = datetime.date.today()
+        if self.rounds_date != today:
+            self.rounds = []
+            self.rounds_date = today
+
+    def _record_round(self, current_round):
+        self._close_segment()
+        self._expire_rounds()
+        total = self.round_working + self.round_playing
+        # Without focus data (e.g. the focus tracker is not running) there is
+        # nothing to tell about the focus of the round
+        focus = self.round_working / total if total > 0 else None
+        self.rounds.append(
+            {
+                "round": current_round,
+                "start": self.round_start.__str__(),
+                "end": datetime.datetime.now().__str__(),
+                "working": self.round_working,
+                "playing": self.round_playing,
+                "focus": round(focus, 2) if focus is not None else None,
+            }
+        )
+        return focus
+
+    def _pause(self, idle_time):
+        if not self.working_phase or self.timer is None or self.paused is not None:
+            return
+        # The user has already been away for idle_time, so give it back
+        self.paused = min(self.timer.remaining() + idle_time, self.phase_secs)
+        self.timer.cancel()
+        self.timer = None
+        self._close_segment(idle_time)
+        self._notify_paused()
+
+    def _notify_paused(self):
+        self.notify("Pomodoro timer", "Idle. Pausing round {}".format(self.round()))
+
+    def _resume(self):
+        if self.paused is None:
+            return
+        elapsed = datetime.timedelta(seconds=self.phase_secs - self.paused)
+        self.date_timer_armed = datetime.datetime.now() - elapsed
+        self.timer = self.scheduler.call_later(self.paused, self.phase_callback)
+        self.paused = None
+        self._open_segment()
+        self.notify("Pomodoro timer", "Resuming round {}".format(self.round()))
+
+    def _on_idle(self, idle, idle_time):
+        with self.scheduler.lock:
+            self.user_idle = idle
+            if idle:
+                self._pause(idle_time)
+            else:
+                self._resume()
+
+    def _on_long_idle(self, idle, idle_time):
+        if not idle:
+            return
+        with self.scheduler.lock:
+            if self.state == PomodoroTimer.State.idle:
+                return
+            self.notify("Pomodoro timer", "Idle for a long time. Stop working")
+            self._stop()
 
     def start_resting(self):
         current_round = self.round()
+        focus = self._record_round(current_round)
+        self.working_phase = False
         self.state += 1
         next_round = current_round + 1
 
         if self.round_per_session != 0 and next_round % self.round_per_session == 0:
             rest_time = self.rest_time_after_session
-            message = "Session done."
+            message = "Session done"
         else:
             rest_time = self.rest_time_in_session
-            message = "Round {} done.".format(current_round)
+            message = "Round {} done".format(current_round)
+        if focus is None:
+            message += " (focus n/a)."
+        else:
+            message += " ({:.0%} focused).".format(focus)
         message += " Resting for {} mins.".format(rest_time)
 
         self.notify("Pomodoro timer", "Start resting. " + message)
@@ -62,6 +176,11 @@ class PomodoroTimer(Notifier):
 
     def start_round(self):
         round = self.round()
+        self.working_phase = True
+        self.round_start = datetime.datetime.now()
+        self.round_working = 0
+        self.round_playing = 0
+        self._open_segment()
         self.notify(
             "Pomodoro timer",
             "Start working. Round {} for {} mins".format(round, self.working_time),
@@ -69,31 +188,42 @@ class PomodoroTimer(Notifier):
         self.arm_timer(self.working_time, self.start_resting)
 
     def run(self):
-        if not self.state == PomodoroTimer.State.idle:
-            return
-        self.state = PomodoroTimer.State.working
-        self.start_round()
+        with self.scheduler.lock:
+            if not self.state == PomodoroTimer.State.idle:
+                return
+            self.state = PomodoroTimer.State.working
+            self.start_round()
 
     def _stop(self):
-        if self.timer != None and self.timer.is_alive():
-            self.timer.cancel()
-            self.timer = None
-        self._reset()
+        with self.scheduler.lock:
+            if self.timer != None:
+                self.timer.cancel()
+                self.timer = None
+            self._reset()
 
     def stop(self):
-        if self.state == PomodoroTimer.State.idle:
-            return
-        self.notify("Pomodoro timer", "Stop working")
-        self._stop()
+        with self.scheduler.lock:
+            if self.state == PomodoroTimer.State.idle:
+                return
+            self.notify("Pomodoro timer", "Stop working")
+            self._stop()
 
     def reset(self):
-        was_running = self.state >= PomodoroTimer.State.working
-        self.stop()
-        self._reset()
-        if was_running:
-            self.run()
+        # Hold the scheduler lock so a phase callback cannot re-arm the timer
+        # between stopping and restarting
+        with self.scheduler.lock:
+            was_running = self.state >= PomodoroTimer.State.working
+            self.stop()
+            self._reset()
+            self.rounds = []
+            if was_running:
+                self.run()
 
     def report(self):
+        with self.scheduler.lock:
+            return self._report()
+
+    def _report(self):
         state = (
             self.state
             if self.state <= PomodoroTimer.State.working
@@ -102,6 +232,13 @@ class PomodoroTimer(Notifier):
         state_texts = ["idle", "resting", "working"]
         res = {"state": state_texts[state]}
         if state != PomodoroTimer.State.idle:
-            elapsed = datetime.datetime.now() - self.date_timer_armed
+            if self.paused is not None:
+                elapsed = datetime.timedelta(seconds=self.phase_secs - self.paused)
+                res["paused"] = True
+            else:
+                elapsed = datetime.datetime.now() - self.date_timer_armed
             res |= {"round": self.round(), "elapsed": elapsed.__str__()}
+        self._expire_rounds()
+        if len(self.rounds) > 0:
+            res["rounds"] = list(self.rounds)
         return res
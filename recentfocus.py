@@ -0,0 +1,138 @@
+import array
+import threading
+import time
+
+
+class RecentFocus(object):
+    # Fixed-size ring of the most recent focus samples. Every column is a
+    # preallocated array and app and window names are interned into small
+    # integer ids. A name table never holds more than capacity names: when it
+    # is full it is rebuilt from the names the ring still refers to.
+
+    class Names(object):
+        def __init__(self, ids):
+            # ids is the ring column holding ids into this table
+            self.ids = ids
+            self.table = {}
+            self.names = []
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array.array("d", [0.0]) * capacity
+        self.durations = array.array("d", [0.0]) * capacity
+        self.app_ids = array.array("I", [0]) * capacity
+        self.title_ids = array.array("I", [0]) * capacity
+        self.working = array.array("B", [0]) * capacity
+        self.apps = RecentFocus.Names(self.app_ids)
+        self.titles = RecentFocus.Names(self.title_ids)
+        self.head = 0
+        self.size = 0
+        # track() runs on the sampler thread, report() on the command thread
+        self.lock = threading.Lock()
+        self.new_day()
+
+    def new_day(self):
+        with self.lock:
+            self.current_streak = 0
+            self.longest_streak = 0
+
+    def _compact(self, names):
+        # The oldest slot is about to be overwritten once the ring is full
+        live = self.size - 1 if self.size == self.capacity else self.size
+        old_names = names.names
+        names.table = {}
+        names.names = []
+        i = self.head
+        for _ in range(live):
+            i = (i - 1) % self.capacity
+            names.ids[i] = self._intern(names, old_names[names.ids[i]])
+
+    def _intern(self, names, name):
+        id_ = names.table.get(name)
+        if id_ is None:
+            if len(names.names) == self.capacity:
+                self._compact(names)
+                return self._intern(names, name)
+            id_ = len(names.names)
+            names.table[name] = id_
+            names.names.append(name)
+        return id_
+
+    def track(self, app, title, secs, working):
+        with self.lock:
+            app_id = self._intern(self.apps, app)
+            title_id = self._intern(self.titles, title)
+            i = self.head
+            self.timestamps[i] = time.monotonic()
+            self.durations[i] = secs
+            self.app_ids[i] = app_id
+            self.title_ids[i] = title_id
+            self.working[i] = working
+            self.head = (i + 1) % self.capacity
+            if self.size < self.capacity:
+                self.size += 1
+
+            if working:
+                self.current_streak += secs
+                self.longest_streak = max(self.longest_streak, self.current_streak)
+            else:
+                self.current_streak = 0
+
+    def _since(self, start):
+        # Slots from the newest to the oldest sample taken after start
+        i = self.head
+        for _ in range(self.size):
+            i = (i - 1) % self.capacity
+            if self.timestamps[i] < start:
+                return
+            yield i
+
+    def covered(self, now):
+        # Seconds of history the ring holds, counting the oldest sample's own
+        # duration
+        if self.size == 0:
+            return 0
+        oldest = (self.head - self.size) % self.capacity
+        return now - self.timestamps[oldest] + self.durations[oldest]
+
+    def report(self, secs):
+        with self.lock:
+            return self._report(secs)
+
+    def _report(self, secs):
+        now = time.monotonic()
+        secs = min(secs, self.covered(now))
+        working = 0
+        playing = 0
+        switches = 0
+        window_switches = 0
+        apps = {}
+        next_app = None
+        next_title = None
+        for i in self._since(now - secs):
+            app = self.app_ids[i]
+            title = self.title_ids[i]
+            if next_app is not None and app != next_app:
+                switches += 1
+            elif next_title is not None and title != next_title:
+                window_switches += 1
+            next_app = app
+            next_title = title
+            if self.working[i]:
+                working += self.durations[i]
+            else:
+                playing += self.durations[i]
+            apps[app] = apps.get(app, 0) + self.durations[i]
+
+        per_minute = round(switches * 60 / secs, 2) if secs > 0 else 0
+        return {
+            "window": secs,
+            "working": working,
+            "playing": playing,
+            "switches": switches,
+            "switches per minute": per_minute,
+            "window switches": window_switches,
+            "current streak": self.current_streak,
+            "longest streak today": self.longest_streak,
+            "apps": {self.apps.names[app]: total for app, total in apps.items()},
+        }
@@ -0,0 +1,98 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+
+class Scheduler(object):
+    # A single thread serving every timer of the tracker. Deadlines are on
+    # the time.monotonic() clock. Callbacks run on the scheduler thread while
+    # holding self.lock, so a component that cancels and re-arms its timers
+    # under the same lock never races with its own callbacks.
+
+    class Handle(object):
+        def __init__(self, scheduler, deadline, callback):
+            self.scheduler = scheduler
+            self.deadline = deadline
+            self.callback = callback
+            self.queued = True
+            self.cancelled = False
+            self.fired = False
+
+        def cancel(self):
+            self.scheduler._cancel(self)
+
+        def remaining(self):
+            return max(0, self.deadline - time.monotonic())
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._cond = threading.Condition(threading.Lock())
+        self._heap = []
+        self._seq = itertools.count()
+        # Number of cancelled handles still sitting in the heap
+        self._cancelled = 0
+        self._thread = None
+
+    def call_at(self, deadline, callback):
+        handle = Scheduler.Handle(self, deadline, callback)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), handle))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def call_later(self, delay, callback):
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def _cancel(self, handle):
+        # Taking self.lock waits out a callback that is currently running, so
+        # once cancel() returns the callback is neither running nor pending.
+        with self.lock:
+            with self._cond:
+                if handle.cancelled or handle.fired:
+                    return
+                handle.cancelled = True
+                if not handle.queued:
+                    return
+                self._cancelled += 1
+                if self._cancelled * 2 > len(self._heap):
+                    self._compact()
+                self._cond.notify()
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def _next_expired(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)[2].queued = False
+                    self._cancelled -= 1
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                timeout = self._heap[0][0] - time.monotonic()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+                handle = heapq.heappop(self._heap)[2]
+                handle.queued = False
+                return handle
+
+    def _run(self):
+        while True:
+            handle = self._next_expired()
+            with self.lock:
+                if handle.cancelled:
+                    continue
+                handle.fired = True
+                try:
+                    handle.callback()
+                except Exception:
+                    traceback.print_exc()
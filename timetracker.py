@@ -17,13 +17,22 @@ Notify.init("Timetracker")
 from focustracker import FocusTracker
 from notifier import Notifier
 from pomodoro import PomodoroTimer
+from scheduler import Scheduler
 
 
 class WorkingHourManager(Notifier):
     def __init__(self, config, report_each_hour):
-        self.focus_tracker = FocusTracker(config=config["focustracker"])
-        self.pomodoro_timer = PomodoroTimer(config=config["pomodoro"])
+        self.scheduler = Scheduler()
+        self.focus_tracker = FocusTracker(
+            config=config["focustracker"], scheduler=self.scheduler
+        )
+        self.pomodoro_timer = PomodoroTimer(
+            config=config["pomodoro"],
+            scheduler=self.scheduler,
+            focus_tracker=self.focus_tracker,
+        )
         self.report_each_hour = report_each_hour
+        self.report_timer = None
         self.timer_running = False
 
     def _handle_command(self, args, targets):
@@ -37,13 +46,18 @@ class WorkingHourManager(Notifier):
         now = datetime.datetime.now()
         sleep = 3600 - now.timestamp() % 3600
         print("sleeping {}".format(sleep))
-        if not self.timer_running:
-            self.report_timer = threading.Timer(sleep, self._report_timer_callback)
-            self.report_timer.start()
-            self.timer_running = True
+        with self.scheduler.lock:
+            if not self.timer_running:
+                self.report_timer = self.scheduler.call_later(
+                    sleep, self._report_timer_callback
+                )
+                self.timer_running = True
 
     def _report_timer_callback(self):
-        self.report([])
+        # Callbacks run on the shared scheduler thread under its lock, so keep
+        # the slow notification work off of it
+        threading.Thread(target=self.report, args=([],)).start()
+        self.timer_running = False
         self._arm_report_timer()
 
     def run(self, args):
@@ -65,10 +79,11 @@ class WorkingHourManager(Notifier):
         }
         self._handle_command(args, targets)
 
-        if self.timer_running and self.report_timer:
-            self.report_timer.cancel()
-            self.report_timer = None
-            self.timer_running = False
+        with self.scheduler.lock:
+            if self.timer_running and self.report_timer:
+                self.report_timer.cancel()
+                self.report_timer = None
+                self.timer_running = False
 
     def _time_format(self, seconds: int):
         if seconds is not None:
@@ -118,11 +133,31 @@ class WorkingHourManager(Notifier):
         )
         pass
 
+    def _report_recent(self, recent):
+        msg = "Last {}\n".format(self._time_format(recent["window"]))
+        msg += "Working time :  {}\n".format(self._time_format(recent["working"]))
+        msg += "Playing time :  {}\n".format(self._time_format(recent["playing"]))
+        msg += "Switches     :  {} ({}/min), {} within apps\n".format(
+            recent["switches"],
+            recent["switches per minute"],
+            recent["window switches"],
+        )
+        msg += "Focus streak :  {} (longest {})".format(
+            self._time_format(recent["current streak"]),
+            self._time_format(recent["longest streak today"]),
+        )
+
+        self.notify("Recent focus report", msg)
+        print(json.dumps(recent, indent=4, sort_keys=True, ensure_ascii=False))
+
     def _report_pomodoro(self, pomo):
         print(json.dumps(pomo, indent=4, sort_keys=True))
 
     def report(self, args):
         typ = "all" if len(args) < 1 else args[0]
+        if typ == "recent":
+            self._report_recent_command(args[1:])
+            return
         if typ not in ["all", "working", "playing", "summary"]:
             print("wrong argument {}".format(typ))
             return
@@ -133,6 +168,14 @@ class WorkingHourManager(Notifier):
         pomo = self.pomodoro_timer.report()
         self._report_pomodoro(pomo)
 
+    def _report_recent_command(self, args):
+        mins = "15" if len(args) < 1 else args[0]
+        if not mins.isdigit() or int(mins) == 0:
+            print("wrong argument {}".format(mins))
+            return
+        recent = self.focus_tracker.report_recent(int(mins) * 60)
+        self._report_recent(recent)
+
     def reset(self, args):
         self.focus_tracker.reset()
         self.pomodoro_timer.reset()
@@ -210,11 +253,13 @@ default_conf = {
         "rest_time_after_session": 0,
         "working_time": 50,
         "idle_threshold": 120,
+        "idle_stop_threshold": 1800,
     },
     "focustracker": {
         "duration": 5,
         "idle_threshold": 180,
         "idle_long_threshold": 1800,
+        "recent_window": 7200,
         "working_list": "working.json",
     },
 }